@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'barberpro.settings')
 
 application = get_asgi_application()
+
+# Precalcular URLconf y plantillas en el proceso maestro (útil con `gunicorn --preload`)
+# para que los workers estén listos desde el primer request.
+from scheduling.warmup import warm_up  # noqa: E402
+
+warm_up()
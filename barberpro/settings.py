@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +53,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'scheduling.middleware.TenantShardMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +88,27 @@ DATABASES = {
     }
 }
 
+# Shards opcionales por barbería (ver scheduling/sharding.py). Cada alias de
+# BARBERPRO_SHARDS (ej: "shard1,shard2") es una base SQLite propia en local.
+# Las barberías se asignan a un shard con `manage.py move_tenant`.
+TENANT_SHARDS = [alias.strip() for alias in os.environ.get('BARBERPRO_SHARDS', '').split(',') if alias.strip()]
+
+for alias in TENANT_SHARDS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+    }
+
+# Los tests de sharding usan un shard 'shard1' (`databases = {'default', 'shard1'}`) y
+# activan TENANT_SHARDS con override_settings; con SQLite su base de test vive en memoria.
+if len(sys.argv) > 1 and sys.argv[1] == 'test' and 'shard1' not in DATABASES:
+    DATABASES['shard1'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shard1.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['scheduling.sharding.TenantRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
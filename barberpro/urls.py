@@ -26,6 +26,9 @@ urlpatterns = [
     # URL para la API de disponibilidad
     path('api/available-slots/', scheduling_views.get_available_slots, name='api_available_slots'),
 
+    # Readiness para balanceador / autoscaler
+    path('healthz/ready/', scheduling_views.readiness_check, name='readiness_check'),
+
     # Rutas del panel de admin interno
     path('admin/', admin.site.urls),
     path('app/', include('scheduling.urls', namespace='scheduling')),
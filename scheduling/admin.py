@@ -1,29 +1,145 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import BarberShop, Service, Client, Appointment
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import BarberShop, Service, Client, Appointment, TenantShard
+from .sharding import shard_databases
 
 # Register your models here.
 
+def estimate_row_count(model, using):
+    """
+    Devuelve la cantidad aproximada de filas de la tabla según las estadísticas de
+    PostgreSQL (pg_class.reltuples, que autovacuum mantiene al día), o None si no
+    hay estimación. En SQLite, sqlite_stat1 solo cambia con un ANALYZE manual y se
+    queda corta cuando la tabla crece, así que allí siempre se cuenta exacto.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    En listados sin filtros sobre tablas grandes usa la estimación del motor en
+    lugar de un COUNT(*) completo. Con filtros (o tablas pequeñas) cuenta exacto.
+    """
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """
+    Elige el shard a listar. El TenantShardMiddleware guarda la elección en la sesión
+    y enruta ahí las consultas del admin (listado, edición y autocompletado).
+    """
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        self.current = self.value() or request.session.get('admin_shard', 'default')
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in shard_databases()]
+
+    def choices(self, changelist):
+        # Sin opción "Todos": cada listado muestra una sola base.
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.current == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        # El enrutamiento ya lo hizo el middleware.
+        return queryset
+
+
+# Solo se muestra cuando hay shards configurados.
+SHARD_FILTERS = (ShardListFilter,) if getattr(settings, 'TENANT_SHARDS', None) else ()
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Evita el segundo COUNT(*) sobre toda la tabla al filtrar ("x de N resultados").
+    show_full_result_count = False
+
+
 @admin.register(BarberShop)
-class BarberShopAdmin(admin.ModelAdmin):
-    list_display = ('name', 'owner', 'subscription_plan', 'created_at')
+class BarberShopAdmin(ScalableModelAdmin):
+    list_display = ('name', 'owner', 'subscription_plan', 'created_at', 'shard_database')
+    list_select_related = ('owner', 'shard')
     search_fields = ('name', 'owner__username')
+    autocomplete_fields = ('owner',)
+    ordering = ('name',)
+
+    @admin.display(description='Shard')
+    def shard_database(self, obj):
+        try:
+            return obj.shard.database
+        except TenantShard.DoesNotExist:
+            return 'default'
+
+@admin.register(TenantShard)
+class TenantShardAdmin(admin.ModelAdmin):
+    list_display = ('barbershop', 'database', 'status', 'updated_at')
+    list_filter = ('database', 'status')
+    list_select_related = ('barbershop',)
+    # Los cambios de shard se hacen con `manage.py move_tenant` para copiar los datos.
+    readonly_fields = ('barbershop', 'database', 'status', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(ScalableModelAdmin):
     list_display = ('name', 'price', 'duration_minutes', 'barbershop')
-    list_filter = ('barbershop',)
-    search_fields = ('name',)
+    # Sin filtro lateral por barbería: cargaría todas las barberías en cada listado.
+    # Se busca por nombre de la barbería.
+    list_filter = SHARD_FILTERS
+    list_select_related = ('barbershop',)
+    search_fields = ('name', 'barbershop__name')
+    autocomplete_fields = ('barbershop',)
+    ordering = ('name',)
+
+    def get_queryset(self, request):
+        # Service.__str__ usa barbershop.name; también aplica a los resultados del autocompletado.
+        return super().get_queryset(request).select_related('barbershop')
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'phone', 'nickname', 'barbershop')
-    list_filter = ('barbershop',)
-    search_fields = ('name', 'phone')
+class ClientAdmin(ScalableModelAdmin):
+    list_display = ('name', 'phone', 'nickname', 'barbershop', 'total_spent', 'visit_count', 'last_visit')
+    list_filter = SHARD_FILTERS
+    list_select_related = ('barbershop',)
+    search_fields = ('name', 'phone', 'barbershop__name')
+    readonly_fields = ('total_spent', 'visit_count', 'last_visit')
+    autocomplete_fields = ('barbershop',)
+    # Orden por clave primaria: estable para paginar y no requiere índice adicional.
+    ordering = ('-pk',)
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(ScalableModelAdmin):
     list_display = ('client', 'service', 'date', 'time', 'status', 'barbershop')
-    list_filter = ('status', 'date', 'barbershop')
-    search_fields = ('client__name', 'service__name')
+    list_filter = SHARD_FILTERS + ('status',)
+    # Appointment.__str__ y Service.__str__ usan client y service.barbershop.
+    list_select_related = ('client', 'service__barbershop', 'barbershop')
+    search_fields = ('client__name', 'service__name', 'barbershop__name')
+    autocomplete_fields = ('barbershop', 'client', 'service')
+    # Navegación por fecha sobre el índice (date, time).
+    date_hierarchy = 'date'
     ordering = ('-date', '-time')
-
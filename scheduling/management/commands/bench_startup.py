@@ -0,0 +1,117 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Cada objetivo se ejecuta en un intérprete nuevo con `-X importtime`, de modo
+# que medimos un arranque en frío real y no el estado de este proceso.
+WSGI_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+from barberpro.wsgi import application
+t1 = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': %(path)r}
+setup_testing_defaults(environ)
+status = []
+b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+t2 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'first_request': t2 - t1, 'status': status[0]}))
+"""
+
+ASGI_SNIPPET = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from barberpro.asgi import application
+t1 = time.perf_counter()
+status = []
+messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+async def receive():
+    if messages:
+        return messages.pop()
+    # Tras el cuerpo el cliente sigue conectado hasta que se cancele la espera.
+    await asyncio.Event().wait()
+
+async def send(message):
+    if message['type'] == 'http.response.start':
+        status.append(str(message['status']))
+
+scope = {
+    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+    'method': 'GET', 'scheme': 'http', 'path': %(path)r, 'raw_path': %(path)r.encode(),
+    'query_string': b'', 'headers': [(b'host', b'127.0.0.1')],
+    'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+}
+asyncio.run(application(scope, receive, send))
+t2 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'first_request': t2 - t1, 'status': status[0]}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque en frío de manage.py, wsgi.py y asgi.py: tiempo total, "
+        "tiempo de importación (python -X importtime) y tiempo hasta el primer request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Ejecuciones por objetivo (se reporta la mediana).")
+        parser.add_argument('--path', default='/', help="Ruta usada para el primer request.")
+        parser.add_argument('--top', type=int, default=10, help="Cantidad de módulos más lentos a mostrar.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        targets = [
+            ('manage.py', [os.path.join(settings.BASE_DIR, 'manage.py'), 'check']),
+            ('wsgi.py', ['-c', WSGI_SNIPPET % {'path': path}]),
+            ('asgi.py', ['-c', ASGI_SNIPPET % {'path': path}]),
+        ]
+
+        for name, argv in targets:
+            runs = [self._run(argv) for _ in range(options['repeat'])]
+            wall = statistics.median(r['wall'] for r in runs)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}"))
+            self.stdout.write(f"  proceso completo:   {wall * 1000:8.1f} ms (mediana de {len(runs)})")
+
+            timings = [r['timings'] for r in runs if r['timings']]
+            if timings:
+                imp = statistics.median(t['import'] for t in timings)
+                first = statistics.median(t['first_request'] for t in timings)
+                self.stdout.write(f"  import aplicación:  {imp * 1000:8.1f} ms")
+                self.stdout.write(f"  primer request:     {first * 1000:8.1f} ms (HTTP {timings[-1]['status']})")
+
+            imports = runs[-1]['imports']
+            total_self = sum(self_us for self_us, _, _ in imports)
+            self.stdout.write(f"  importtime (self):  {total_self / 1000:8.1f} ms en {len(imports)} módulos")
+            for self_us, cumulative_us, module in sorted(imports, key=lambda i: i[1], reverse=True)[:options['top']]:
+                self.stdout.write(f"    {cumulative_us / 1000:8.1f} ms  {module}")
+
+    def _run(self, argv):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'barberpro.settings'))
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + argv,
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - start
+
+        imports = []
+        for line in result.stderr.splitlines():
+            # Formato: "import time:       self [us] |  cumulative | imported package"
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+            imports.append((int(self_us), int(cumulative_us), module.strip()))
+
+        timings = None
+        lines = result.stdout.strip().splitlines()
+        if result.returncode == 0 and lines and lines[-1].startswith('{'):
+            timings = json.loads(lines[-1])
+
+        return {'wall': wall, 'imports': imports, 'timings': timings}
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from scheduling.models import Appointment
+
+SERVICE_LINK_RE = re.compile(r'/book/service/(\d+)/')
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+IDEMPOTENCY_INPUT_RE = re.compile(r'name="idempotency_key" value="([^"]*)"')
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def cookies(self):
+        jar = {}
+        for name, value in self.headers:
+            if name == 'set-cookie':
+                key, _, rest = value.partition('=')
+                jar[key.strip()] = rest.split(';', 1)[0]
+        return jar
+
+    def header(self, name):
+        for key, value in self.headers:
+            if key == name:
+                return value
+        return None
+
+
+async def http_request(host, port, method, path, headers=None, body=b'', timeout=10.0):
+    """
+    Cliente HTTP/1.1 mínimo sobre asyncio (una conexión por request, `Connection: close`).
+    Suficiente para hablar con runserver/gunicorn sin dependencias externas.
+    """
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close',
+             f'Content-Length: {len(body)}']
+    for key, value in (headers or {}).items():
+        lines.append(f'{key}: {value}')
+    raw = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+    async def _do():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(raw)
+            await writer.drain()
+            data = await reader.read()
+        finally:
+            writer.close()
+        return data
+
+    data = await asyncio.wait_for(_do(), timeout)
+    head, _, payload = data.partition(b'\r\n\r\n')
+    if not head:
+        raise HTTPError('respuesta vacía')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    status = int(status_line.split(' ', 2)[1])
+    response_headers = []
+    for line in header_lines:
+        key, _, value = line.partition(':')
+        response_headers.append((key.strip().lower(), value.strip()))
+    return Response(status, response_headers, payload)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.funnels = defaultdict(int)
+
+    def record(self, endpoint, elapsed, ok):
+        self.latencies[endpoint].append(elapsed)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @property
+    def total_requests(self):
+        return sum(len(v) for v in self.latencies.values())
+
+
+def percentile(values, pct):
+    # Percentil por rango más cercano.
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def count_overlaps(appointments):
+    """
+    Cuenta pares de citas pendientes que se solapan dentro de la misma barbería y fecha.
+    Usa la misma condición de solapamiento que `AppointmentForm.clean`.
+    """
+    by_day = defaultdict(list)
+    for app in appointments:
+        start = datetime.combine(app.date, app.time)
+        end = start + timedelta(minutes=app.service.duration_minutes if app.service else 0)
+        by_day[(app.barbershop_id, app.date)].append((start, end))
+
+    overlaps = 0
+    for intervals in by_day.values():
+        intervals.sort()
+        for i, (start_a, end_a) in enumerate(intervals):
+            for start_b, end_b in intervals[i + 1:]:
+                if start_b >= end_a:
+                    break
+                if start_a < end_b and end_a > start_b:
+                    overlaps += 1
+    return overlaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula una avalancha de reservas contra un servidor local: recorre el embudo "
+        "/ -> /api/available-slots/ -> /book/service/<id>/ (GET y POST) -> confirmación con "
+        "N clientes concurrentes. Reporta throughput, latencias p50/p95/p99 y errores por "
+        "endpoint, y al final cuenta citas solapadas en la base de datos (debe ser la misma "
+        "que usa el servidor)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="URL base del servidor.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Clientes simultáneos.")
+        parser.add_argument('--users', type=int, default=500, help="Total de embudos de reserva a ejecutar.")
+        parser.add_argument('--days', type=int, default=1,
+                            help="Días (a partir de mañana) entre los que se reparten las reservas.")
+        parser.add_argument('--resubmit', type=float, default=0.0,
+                            help="Fracción de reservas que se envían dos veces a la vez (doble toque).")
+        parser.add_argument('--think-ms', type=int, default=0, help="Pausa máxima aleatoria entre pasos.")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Timeout por request, en segundos.")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--database', default='default',
+                            help="Base de datos (shard) de la barbería para el chequeo de integridad.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError("Solo se soportan URLs http://host:puerto.")
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.options = options
+        self.random = random.Random(options['seed'])
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.dates = [tomorrow + timedelta(days=i) for i in range(max(1, options['days']))]
+
+        started_at = timezone.now()
+        stats = Stats()
+        elapsed = asyncio.run(self._run(stats))
+
+        self._report(stats, elapsed)
+        self._integrity_check(started_at, options['database'])
+
+    async def _run(self, stats):
+        try:
+            home = await http_request(self.host, self.port, 'GET', '/', timeout=self.options['timeout'])
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise CommandError(f"No se pudo conectar a {self.host}:{self.port}: {exc}")
+        service_ids = sorted(set(SERVICE_LINK_RE.findall(home.text)))
+        if not service_ids:
+            raise CommandError("La página de inicio no lista servicios; crea al menos uno antes de la prueba.")
+
+        queue = asyncio.Queue()
+        for n in range(self.options['users']):
+            queue.put_nowait(n)
+
+        async def worker():
+            while True:
+                try:
+                    n = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                outcome = await self._funnel(n, stats)
+                stats.funnels[outcome] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.options['concurrency'])))
+        return time.perf_counter() - start
+
+    async def _call(self, stats, endpoint, method, path, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await http_request(self.host, self.port, method, path,
+                                          timeout=self.options['timeout'], **kwargs)
+        except (OSError, asyncio.TimeoutError, HTTPError, ValueError, IndexError):
+            stats.record(endpoint, time.perf_counter() - start, ok=False)
+            return None
+        ok = response.status in expected
+        stats.record(endpoint, time.perf_counter() - start, ok=ok)
+        return response if ok else None
+
+    async def _think(self):
+        if self.options['think_ms']:
+            await asyncio.sleep(self.random.uniform(0, self.options['think_ms']) / 1000)
+
+    async def _funnel(self, n, stats):
+        # 1. Página de inicio con la lista de servicios.
+        home = await self._call(stats, 'GET /', 'GET', '/')
+        if home is None:
+            return 'error'
+        service_ids = SERVICE_LINK_RE.findall(home.text)
+        if not service_ids:
+            return 'error'
+        service_id = self.random.choice(service_ids)
+        date = self.random.choice(self.dates).isoformat()
+        await self._think()
+
+        # 2. Consultar horarios disponibles.
+        query = urlencode({'date': date, 'service_id': service_id})
+        slots = await self._call(stats, 'GET /api/available-slots/', 'GET', f'/api/available-slots/?{query}')
+        if slots is None:
+            return 'error'
+        available = json.loads(slots.body).get('available_slots', [])
+        if not available:
+            return 'sin_cupo'
+        await self._think()
+
+        # 3. Abrir el formulario de reserva (obtiene la cookie y el token CSRF).
+        form = await self._call(stats, 'GET /book/service/<id>/', 'GET', f'/book/service/{service_id}/')
+        if form is None:
+            return 'error'
+        csrf_cookie = form.cookies().get('csrftoken')
+        match = CSRF_INPUT_RE.search(form.text)
+        if not (csrf_cookie and match):
+            return 'error'
+        await self._think()
+
+        # 4. Enviar la reserva; se espera la redirección a la confirmación.
+        idempotency = IDEMPOTENCY_INPUT_RE.search(form.text)
+        body = urlencode({
+            'csrfmiddlewaretoken': match.group(1),
+            'idempotency_key': idempotency.group(1) if idempotency else '',
+            'name': f'Cliente Carga {n}',
+            'phone': f'809{self.random.randrange(10 ** 7):07d}',
+            'date': date,
+            'time': self.random.choice(available),
+        }).encode()
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Cookie': f'csrftoken={csrf_cookie}',
+        }
+        post = self._call(
+            stats, 'POST /book/service/<id>/', 'POST', f'/book/service/{service_id}/', expected=(302,),
+            headers=headers, body=body,
+        )
+        if self.random.random() < self.options['resubmit']:
+            # Doble toque: el mismo formulario se envía dos veces a la vez, y ambos envíos
+            # deben llevar a la misma confirmación.
+            retry = self._call(
+                stats, 'POST /book/service/<id>/ (reenvío)', 'POST', f'/book/service/{service_id}/',
+                expected=(302,), headers=headers, body=body,
+            )
+            responses = [r for r in await asyncio.gather(post, retry) if r is not None]
+            if len({urlsplit(r.header('location') or '').path for r in responses}) > 1:
+                stats.funnels['reenvío_duplicado'] += 1
+            booking = responses[0] if responses else None
+        else:
+            booking = await post
+        if booking is None:
+            return 'error'
+
+        # 5. Página de confirmación.
+        location = urlsplit(booking.header('location') or '').path
+        if not location:
+            return 'error'
+        confirmation = await self._call(stats, 'GET /booking/confirmation/<pk>/', 'GET', location)
+        return 'reservada' if confirmation is not None else 'error'
+
+    def _report(self, stats, elapsed):
+        self.stdout.write(self.style.MIGRATE_HEADING("Resultados"))
+        self.stdout.write(
+            f"  duración: {elapsed:.2f} s  requests: {stats.total_requests}  "
+            f"throughput: {stats.total_requests / elapsed if elapsed else 0:.1f} req/s"
+        )
+        self.stdout.write("  embudos: " + ", ".join(f"{k}={v}" for k, v in sorted(stats.funnels.items())))
+        self.stdout.write(
+            f"  {'endpoint':<34}{'n':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>10}"
+        )
+        for endpoint, values in stats.latencies.items():
+            errors = stats.errors[endpoint]
+            self.stdout.write(
+                f"  {endpoint:<34}{len(values):>7}{len(values) / elapsed:>9.1f}"
+                f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}"
+                f"{percentile(values, 99) * 1000:>9.1f}{errors / len(values):>9.1%}"
+            )
+
+    def _integrity_check(self, started_at, using):
+        self.stdout.write(self.style.MIGRATE_HEADING("Integridad"))
+        created = Appointment.objects.using(using).filter(created_at__gte=started_at)
+        dates = created.values_list('date', flat=True).distinct()
+        appointments = Appointment.objects.using(using).filter(
+            status='pending', date__in=list(dates)
+        ).select_related('service')
+        overlaps = count_overlaps(appointments)
+        self.stdout.write(f"  citas creadas durante la prueba: {created.count()}")
+        if overlaps:
+            self.stdout.write(self.style.ERROR(f"  citas solapadas (pares): {overlaps}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("  citas solapadas (pares): 0"))
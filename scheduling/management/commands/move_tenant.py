@@ -0,0 +1,215 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+
+from scheduling.models import BarberShop, Service, Client, Appointment, IdempotencyKey, TenantShard
+from scheduling.sharding import DEFAULT_DB, database_for, shard_databases, tenant_maintenance
+
+# Orden de copia respetando las claves foráneas.
+TENANT_MODELS = [Service, Client, Appointment, IdempotencyKey]
+BATCH_SIZE = 500
+# Resincronizaciones antes de abortar si el origen sigue cambiando.
+RESYNC_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve los servicios, clientes, citas y llaves de reserva de una barbería a otra base de datos sin "
+        "detener el sitio: copia inicial en caliente, congelamiento breve de escrituras, "
+        "resincronización, cambio del mapa de shards y limpieza del origen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('barbershop_id', type=int)
+        parser.add_argument('database', help="Alias de destino ('default' o uno de TENANT_SHARDS).")
+        parser.add_argument('--keep-source', action='store_true', help="No borrar los datos del origen.")
+        parser.add_argument('--drain-seconds', type=float, default=5.0,
+                            help="Espera tras congelar las escrituras para que terminen los requests en "
+                                 "curso; debe superar la duración del request de escritura más lento.")
+
+    def handle(self, *args, **options):
+        target = options['database']
+        if target not in shard_databases():
+            raise CommandError(f"'{target}' no es una base válida. Opciones: {', '.join(shard_databases())}.")
+        try:
+            barbershop = BarberShop.objects.using(DEFAULT_DB).select_related('owner').get(pk=options['barbershop_id'])
+        except BarberShop.DoesNotExist:
+            raise CommandError(f"No existe la barbería {options['barbershop_id']}.")
+
+        source = database_for(barbershop.pk)
+        if source == target:
+            raise CommandError(f"La barbería ya está en '{target}'.")
+
+        self._check_pk_collisions(barbershop, source, target)
+
+        # Las escrituras del propio comando no pasan por el congelamiento.
+        with tenant_maintenance():
+            self._move(barbershop, source, target, options)
+
+        self.stdout.write(self.style.SUCCESS(f"Barbería {barbershop.pk} movida de '{source}' a '{target}'."))
+
+    def _move(self, barbershop, source, target, options):
+        # 1. Réplica de la barbería (y su dueño) en el destino para las claves foráneas.
+        if target != DEFAULT_DB:
+            barbershop.owner.save(using=target)
+            barbershop.save(using=target)
+
+        # 2. Copia inicial mientras la barbería sigue operando.
+        copied = self._sync(barbershop, source, target)
+        self.stdout.write(f"Copia inicial: {copied} filas.")
+
+        # 3. Congelar escrituras: desde aquí check_tenant_writable() rechaza, justo antes
+        #    de escribir, toda escritura de la barbería, tanto mientras está en 'moving'
+        #    como si intenta escribir en el origen después del cambio de mapa. Se espera a
+        #    que terminen las que ya habían pasado el chequeo y se resincroniza.
+        shard, _ = TenantShard.objects.using(DEFAULT_DB).get_or_create(
+            barbershop=barbershop, defaults={'database': source}
+        )
+        shard.status = 'moving'
+        shard.save(using=DEFAULT_DB)
+        try:
+            time.sleep(options['drain_seconds'])
+            snapshot = self._resync_and_switch(barbershop, source, target, shard)
+        except BaseException:
+            shard.database = source
+            shard.status = 'active'
+            shard.save(using=DEFAULT_DB)
+            raise
+
+        # 4. Limpiar el origen. Ya no recibe escrituras por save()/delete(); si aun así
+        #    cambió (QuerySet.update(), SQL directo), se conserva.
+        if options['keep_source']:
+            return
+        changed = self._changed_since(barbershop, source, snapshot)
+        if changed:
+            self.stderr.write(self.style.WARNING(
+                f"El origen '{source}' cambió después del cambio de mapa ({changed} filas); "
+                f"no se borró. Revisa esas filas y bórralas a mano."
+            ))
+            return
+        self._purge(barbershop, source)
+
+    def _resync_and_switch(self, barbershop, source, target, shard):
+        """
+        Resincroniza y cambia el mapa solo si el origen no cambió desde la copia. La
+        comprobación y el cambio se hacen con el origen bloqueado para escritura, así que
+        una escritura que aún estaba en curso termina antes (y se detecta) o espera a que
+        el mapa ya apunte al destino. Si el origen sigue cambiando se aborta sin cambiarlo.
+        Devuelve las filas copiadas en la última resincronización.
+        """
+        for attempt in range(1, RESYNC_ATTEMPTS + 1):
+            snapshot = {}
+            copied = self._sync(barbershop, source, target, prune=True, snapshot=snapshot)
+            self.stdout.write(f"Resincronización: {copied} filas.")
+            with transaction.atomic(using=source):
+                self._lock_source(barbershop, source)
+                changed = self._changed_since(barbershop, source, snapshot)
+                if not changed:
+                    shard.database = target
+                    shard.status = 'active'
+                    shard.save(using=DEFAULT_DB)
+                    return snapshot
+            self.stdout.write(
+                f"El origen cambió durante la resincronización ({changed} filas); "
+                f"se repite ({attempt}/{RESYNC_ATTEMPTS})."
+            )
+        raise CommandError(
+            f"El origen '{source}' siguió cambiando tras {RESYNC_ATTEMPTS} resincronizaciones; "
+            f"la barbería sigue en '{source}'. Aumenta --drain-seconds y vuelve a intentarlo."
+        )
+
+    def _lock_source(self, barbershop, source):
+        # Bloquea las escrituras en las tablas por barbería del origen hasta el final de la
+        # transacción, esperando a las que estén en curso.
+        connection = connections[source]
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(connection.ops.quote_name(model._meta.db_table) for model in TENANT_MODELS)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {tables} IN SHARE MODE")
+        elif connection.vendor == 'sqlite':
+            # SQLite bloquea toda la base con la primera escritura de la transacción.
+            BarberShop.objects.using(source).filter(pk=barbershop.pk).update(name=F('name'))
+
+    def _check_pk_collisions(self, barbershop, source, target):
+        # Las URLs públicas usan la clave primaria, así que se conserva al copiar.
+        for model in TENANT_MODELS:
+            pks = list(model.objects.using(source).filter(barbershop=barbershop).values_list('pk', flat=True))
+            clash = model.objects.using(target).filter(pk__in=pks).exclude(barbershop_id=barbershop.pk)
+            if clash.exists():
+                raise CommandError(
+                    f"{model._meta.verbose_name_plural}: hay ids de la barbería ya usados por otra "
+                    f"barbería en '{target}'. No se movió nada."
+                )
+
+    def _sync(self, barbershop, source, target, prune=False, snapshot=None):
+        # Con `snapshot`, guarda los valores copiados de cada fila para compararlos con
+        # el origen antes de purgarlo.
+        copied = 0
+        try:
+            with transaction.atomic(using=target):
+                for model in TENANT_MODELS:
+                    fields = [f.name for f in model._meta.concrete_fields if not f.primary_key]
+                    rows = model.objects.using(source).filter(barbershop=barbershop).order_by('pk')
+                    pks = []
+                    batch = []
+                    if snapshot is not None:
+                        snapshot[model] = {}
+                    for obj in rows.iterator(chunk_size=BATCH_SIZE):
+                        pks.append(obj.pk)
+                        batch.append(obj)
+                        if snapshot is not None:
+                            snapshot[model][obj.pk] = self._row_values(model, obj)
+                        if len(batch) == BATCH_SIZE:
+                            copied += self._upsert(model, batch, fields, target)
+                            batch = []
+                    copied += self._upsert(model, batch, fields, target)
+
+                    if prune:
+                        # Filas borradas en el origen durante la copia inicial.
+                        model.objects.using(target).filter(barbershop=barbershop).exclude(pk__in=pks).delete()
+        except IntegrityError as exc:
+            raise CommandError(f"No se pudo copiar a '{target}': {exc}")
+        return copied
+
+    def _row_values(self, model, obj):
+        return tuple(getattr(obj, f.attname) for f in model._meta.concrete_fields)
+
+    def _changed_since(self, barbershop, source, snapshot):
+        # Filas del origen creadas, borradas o modificadas desde la resincronización.
+        changed = 0
+        for model in TENANT_MODELS:
+            copied = snapshot[model]
+            seen = 0
+            rows = model.objects.using(source).filter(barbershop=barbershop).order_by('pk')
+            for obj in rows.iterator(chunk_size=BATCH_SIZE):
+                seen += 1
+                if copied.get(obj.pk) != self._row_values(model, obj):
+                    changed += 1
+            changed += max(0, len(copied) - seen)
+        return changed
+
+    def _upsert(self, model, batch, fields, target):
+        if not batch:
+            return 0
+        # bulk_create no llama a save(): se copian los contadores tal cual. auto_now_add se
+        # desactiva durante la copia para conservar las fechas de creación originales.
+        auto_fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now_add', False)]
+        for field in auto_fields:
+            field.auto_now_add = False
+        try:
+            model.objects.using(target).bulk_create(
+                batch, update_conflicts=True, unique_fields=['id'], update_fields=fields,
+            )
+        finally:
+            for field in auto_fields:
+                field.auto_now_add = True
+        return len(batch)
+
+    def _purge(self, barbershop, source):
+        # La réplica de la barbería se conserva en el origen: no ocupa espacio y
+        # permite volver a mover la barbería allí sin recrearla.
+        with transaction.atomic(using=source):
+            for model in reversed(TENANT_MODELS):
+                model.objects.using(source).filter(barbershop=barbershop).delete()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from scheduling.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las llaves de idempotencia de reservas más viejas que IdempotencyKey.TTL. "
+        "Pensado para ejecutarse periódicamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Base de datos (shard) a limpiar.")
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.expired().using(options['database']).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} llaves expiradas borradas."))
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from scheduling.models import Appointment, Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los contadores desnormalizados de Client (total_spent, visit_count, "
+        "last_visit) a partir de las citas completadas y corrige los que no coincidan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--barbershop', type=int, help="Limitar a una barbería (id).")
+        parser.add_argument('--database', default='default', help="Base de datos (shard) a reconciliar.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo reportar diferencias, sin escribir.")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        clients = Client.objects.using(using)
+        appointments = Appointment.objects.using(using).filter(status='completed')
+        if options['barbershop']:
+            clients = clients.filter(barbershop_id=options['barbershop'])
+            appointments = appointments.filter(barbershop_id=options['barbershop'])
+
+        fixed = 0
+        checked = 0
+        with transaction.atomic(using=using):
+            # Primero se bloquean los clientes y luego se agregan las citas: una actualización
+            # de contadores que llegue mientras tanto espera al bloqueo y recalcula después,
+            # en lugar de ser sobrescrita con valores viejos.
+            current = list(clients.select_for_update().values_list('pk', 'total_spent', 'visit_count', 'last_visit'))
+
+            # Una sola consulta agrupada para todos los clientes.
+            expected = {
+                row['client_id']: (row['total_spent'] or Decimal('0'), row['visit_count'], row['last_visit'])
+                for row in appointments.values('client_id').annotate(
+                    total_spent=Sum('total_price'),
+                    visit_count=Count('pk'),
+                    last_visit=Max('date'),
+                )
+            }
+
+            for pk, total_spent, visit_count, last_visit in current:
+                checked += 1
+                target = expected.get(pk, (Decimal('0'), 0, None))
+                if (total_spent, visit_count, last_visit) == target:
+                    continue
+                fixed += 1
+                if options['verbosity'] >= 2:
+                    self.stdout.write(
+                        f"Cliente {pk}: ({total_spent}, {visit_count}, {last_visit}) -> {target}"
+                    )
+                if not options['dry_run']:
+                    Client.objects.using(using).filter(pk=pk).update(
+                        total_spent=target[0], visit_count=target[1], last_visit=target[2],
+                    )
+
+        verb = "con diferencias" if options['dry_run'] else "corregidos"
+        self.stdout.write(self.style.SUCCESS(f"{checked} clientes revisados, {fixed} {verb}."))
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import reverse
+
+from .sharding import DEFAULT_DB, TenantMoving, get_shard, shard_databases, use_tenant_database
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def tenant_moving_response():
+    response = HttpResponse("La barbería se está migrando; intenta de nuevo en unos segundos.", status=503)
+    response['Retry-After'] = '5'
+    return response
+
+
+class TenantShardMiddleware:
+    """
+    Fija, para cada request, la base de datos donde viven los datos de la barbería.
+
+    - Sitio público y panel: la barbería actual (hoy `get_barbershop()`) y su shard.
+      Si la barbería se está migrando de shard, las escrituras responden 503.
+    - Admin de Django: el shard elegido con el filtro `?shard=`, guardado en sesión
+      para que el formulario de edición y los autocompletados usen la misma base.
+
+    El chequeo del sitio público es solo un atajo: el congelamiento real lo aplica
+    `check_tenant_writable()` antes de cada escritura (también las del admin), y aquí
+    se convierte su `TenantMoving` en la misma respuesta 503. El readiness check no
+    pasa por aquí.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.admin_prefix = None
+        self.readiness_path = None
+
+    def __call__(self, request):
+        if not getattr(settings, 'TENANT_SHARDS', None):
+            return self.get_response(request)
+
+        if self.admin_prefix is None:
+            self.admin_prefix = reverse('admin:index')
+            self.readiness_path = reverse('readiness_check')
+
+        # El readiness check no usa datos de barberías y debe responder 503, no un
+        # error, cuando la base de datos no está disponible.
+        if request.path == self.readiness_path:
+            return self.get_response(request)
+
+        if request.path.startswith(self.admin_prefix):
+            alias = request.GET.get('shard')
+            if alias in shard_databases():
+                request.session['admin_shard'] = alias
+            alias = request.session.get('admin_shard', DEFAULT_DB)
+        else:
+            from .views import get_barbershop
+            barbershop = get_barbershop()
+            shard = get_shard(barbershop.pk) if barbershop else None
+            if shard and shard.status == 'moving' and request.method not in SAFE_METHODS:
+                return tenant_moving_response()
+            alias = shard.database if shard else DEFAULT_DB
+
+        with use_tenant_database(alias):
+            return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, TenantMoving):
+            return tenant_moving_response()
+        return None
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_client_stats(apps, schema_editor):
+    Appointment = apps.get_model('scheduling', 'Appointment')
+    Client = apps.get_model('scheduling', 'Client')
+    rows = Appointment.objects.filter(status='completed').values('client_id').annotate(
+        total_spent=Sum('total_price'),
+        visit_count=Count('pk'),
+        last_visit=Max('date'),
+    )
+    for row in rows:
+        Client.objects.filter(pk=row['client_id']).update(
+            total_spent=row['total_spent'] or 0,
+            visit_count=row['visit_count'],
+            last_visit=row['last_visit'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='last_visit',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='visit_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['barbershop', '-total_spent'], name='client_shop_spent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['barbershop', 'last_visit'], name='client_shop_last_visit_idx'),
+        ),
+        migrations.RunPython(backfill_client_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0003_appointment_date_time_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantShard',
+            fields=[
+                ('barbershop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='scheduling.barbershop')),
+                ('database', models.CharField(default='default', help_text='Alias en settings.DATABASES', max_length=50)),
+                ('status', models.CharField(choices=[('active', 'Activo'), ('moving', 'En migración')], default='active', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,9 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, router, transaction
+from django.db.models import Count, Max, Sum
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
@@ -17,6 +21,26 @@ class BarberShop(models.Model):
     def __str__(self):
         return self.name
 
+class TenantShard(models.Model):
+    """
+    Mapa de shards: indica en qué base de datos viven los servicios, clientes y
+    citas de una barbería. Las barberías sin entrada usan la base 'default'.
+    Esta tabla vive siempre en 'default'.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Activo'),
+        ('moving', 'En migración'),
+    ]
+
+    barbershop = models.OneToOneField(BarberShop, on_delete=models.CASCADE, primary_key=True, related_name="shard")
+    database = models.CharField(max_length=50, default='default', help_text="Alias en settings.DATABASES")
+    # Mientras está en 'moving' se rechazan las escrituras de la barbería.
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.barbershop_id} -> {self.database}"
+
 class Service(models.Model):
     """
     Servicios ofrecidos por una barbería específica.
@@ -29,6 +53,16 @@ class Service(models.Model):
     def __str__(self):
         return f"{self.name} - {self.barbershop.name}"
 
+class ClientQuerySet(models.QuerySet):
+    def top_spenders(self, barbershop, limit=5):
+        # Usa el índice (barbershop, -total_spent).
+        return self.filter(barbershop=barbershop, visit_count__gt=0).order_by('-total_spent')[:limit]
+
+    def lapsed(self, barbershop, since):
+        # Clientes que han venido alguna vez pero no desde `since`. Usa el índice (barbershop, last_visit).
+        return self.filter(barbershop=barbershop, last_visit__lt=since).order_by('last_visit')
+
+
 class Client(models.Model):
     """
     Clientes de una barbería. Un cliente pertenece a una sola barbería
@@ -39,10 +73,57 @@ class Client(models.Model):
     phone = models.CharField(max_length=20, unique=True, blank=True, null=True)
     nickname = models.CharField(max_length=50, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Contadores desnormalizados sobre las citas completadas del cliente. Se mantienen
+    # con las señales de Appointment (scheduling/signals.py), en la misma transacción que
+    # la cita, y se pueden reconstruir con `manage.py rebuild_client_stats`.
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    visit_count = models.PositiveIntegerField(default=0, editable=False)
+    last_visit = models.DateField(null=True, blank=True, editable=False)
+
+    LIFETIME_STATS_FIELDS = ('total_spent', 'visit_count', 'last_visit')
+
+    objects = ClientQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['barbershop', '-total_spent'], name='client_shop_spent_idx'),
+            models.Index(fields=['barbershop', 'last_visit'], name='client_shop_last_visit_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.phone})"
 
+    def save(self, *args, **kwargs):
+        # Los contadores solo los escribe refresh_lifetime_stats(): una instancia cargada
+        # antes de que cambiaran no debe sobrescribirlos al guardarse, salvo que se pidan
+        # explícitamente en update_fields.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.LIFETIME_STATS_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def refresh_lifetime_stats(cls, client_id, using=None):
+        """
+        Recalcula total_spent, visit_count y last_visit a partir de las citas completadas.
+        Bloquea la fila del cliente para que dos actualizaciones concurrentes no se pisen.
+        """
+        using = using or router.db_for_write(cls)
+        with transaction.atomic(using=using):
+            list(cls.objects.using(using).select_for_update().filter(pk=client_id).values_list('pk'))
+            stats = Appointment.objects.using(using).filter(client_id=client_id, status='completed').aggregate(
+                total_spent=Sum('total_price'),
+                visit_count=Count('pk'),
+                last_visit=Max('date'),
+            )
+            cls.objects.using(using).filter(pk=client_id).update(
+                total_spent=stats['total_spent'] or 0,
+                visit_count=stats['visit_count'],
+                last_visit=stats['last_visit'],
+            )
+
 class Appointment(models.Model):
     """
     Citas agendadas en una barbería.
@@ -67,6 +148,46 @@ class Appointment(models.Model):
     class Meta:
         # Evita que se pueda agendar más de una cita para la misma barbería a la misma fecha y hora.
         unique_together = ('barbershop', 'date', 'time')
+        indexes = [
+            # Orden por defecto del admin (-date, -time) y filtros de date_hierarchy sin barbería.
+            models.Index(fields=['date', 'time'], name='appointment_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"Cita de {self.client.name} el {self.date} a las {self.time}"
+
+    def save(self, *args, **kwargs):
+        # Las señales de scheduling/signals.py recalculan los contadores del cliente durante
+        # el guardado; la transacción los confirma junto con la cita. Los borrados ya corren
+        # dentro de la transacción de Collector.delete().
+        using = kwargs.get('using') or router.db_for_write(Appointment, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+class IdempotencyKey(models.Model):
+    """
+    Llave emitida con cada formulario de reserva pública. Si el mismo formulario se
+    envía otra vez (reintentos de red, doble toque), se devuelve la cita original
+    en lugar de crear otra.
+    """
+    # Tiempo que se conservan las llaves; `manage.py purge_idempotency_keys` borra las más viejas.
+    TTL = timedelta(hours=24)
+
+    key = models.CharField(max_length=64, unique=True)
+    barbershop = models.ForeignKey(BarberShop, on_delete=models.CASCADE, related_name="idempotency_keys")
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name="idempotency_keys")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+    @classmethod
+    def appointment_for(cls, key):
+        """Id de la cita creada con `key`, o None si la llave no se ha usado o ya venció."""
+        return cls.objects.filter(
+            key=key, created_at__gte=timezone.now() - cls.TTL
+        ).values_list('appointment_id', flat=True).first()
+
+    @classmethod
+    def expired(cls):
+        return cls.objects.filter(created_at__lt=timezone.now() - cls.TTL)
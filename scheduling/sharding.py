@@ -0,0 +1,137 @@
+"""
+Ubicación opcional de cada barbería en su propia base de datos (shard).
+
+`BarberShop`, los usuarios y el mapa `TenantShard` viven en 'default'. Los
+modelos por barbería (`Service`, `Client`, `Appointment`, `IdempotencyKey`) se
+leen y escriben en el shard de la barbería activa, que el middleware fija por
+request con `use_tenant_database()`. Sin `settings.TENANT_SHARDS` todo sigue en
+'default'.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+DEFAULT_DB = 'default'
+
+# Modelos cuyos datos pertenecen a una barbería y se reparten entre shards.
+TENANT_MODELS = {'service', 'client', 'appointment', 'idempotencykey'}
+
+_current_database = ContextVar('tenant_database', default=None)
+_maintenance = ContextVar('tenant_maintenance', default=False)
+
+
+class TenantMoving(Exception):
+    """Escritura rechazada: la barbería se está migrando o ya no vive en esa base."""
+
+
+def shard_databases():
+    """Alias de base de datos que pueden alojar barberías ('default' incluido)."""
+    return [DEFAULT_DB] + list(getattr(settings, 'TENANT_SHARDS', []))
+
+
+def get_shard(barbershop_id):
+    """Entrada del mapa de shards de la barbería, o None si está en 'default'."""
+    if not getattr(settings, 'TENANT_SHARDS', None) or barbershop_id is None:
+        return None
+    from .models import TenantShard
+    return TenantShard.objects.using(DEFAULT_DB).filter(barbershop_id=barbershop_id).first()
+
+
+def database_for(barbershop_id):
+    shard = get_shard(barbershop_id)
+    return shard.database if shard else DEFAULT_DB
+
+
+def current_database():
+    return _current_database.get()
+
+
+@contextmanager
+def use_tenant_database(alias):
+    """Enruta las consultas de modelos por barbería hacia `alias` dentro del bloque."""
+    token = _current_database.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_database.reset(token)
+
+
+@contextmanager
+def tenant_maintenance():
+    """Desactiva `check_tenant_writable()` dentro del bloque (lo usa `move_tenant`)."""
+    token = _maintenance.set(True)
+    try:
+        yield
+    finally:
+        _maintenance.reset(token)
+
+
+def in_tenant_maintenance():
+    return _maintenance.get()
+
+
+def check_tenant_writable(barbershop_id, using):
+    """
+    Lanza `TenantMoving` si la barbería se está migrando o si `using` ya no es su
+    shard. Se llama justo antes de cada escritura (no solo al inicio del request) para
+    que un request que leyó el mapa antes de `move_tenant` no escriba en el origen.
+    """
+    if not getattr(settings, 'TENANT_SHARDS', None) or _maintenance.get():
+        return
+    shard = get_shard(barbershop_id)
+    if shard and shard.status == 'moving':
+        raise TenantMoving(f"La barbería {barbershop_id} se está migrando de base de datos.")
+    if using != (shard.database if shard else DEFAULT_DB):
+        raise TenantMoving(f"La barbería {barbershop_id} ya no vive en '{using}'.")
+
+
+def is_tenant_model(model):
+    return model._meta.app_label == 'scheduling' and model._meta.model_name in TENANT_MODELS
+
+
+class TenantRouter:
+    """
+    Router de bases de datos para los modelos por barbería.
+
+    Orden de decisión: la base de la instancia ya cargada, el shard de la barbería
+    de la instancia (o de la barbería misma, en `barbershop.services.all()`), y por
+    último la base activa del contexto. Los demás modelos no se enrutan.
+    """
+
+    def _db_for_tenant_model(self, model, **hints):
+        if not is_tenant_model(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._meta.model_name == 'barbershop':
+                return database_for(instance.pk)
+            if is_tenant_model(type(instance)):
+                if instance._state.db:
+                    return instance._state.db
+                if instance.barbershop_id:
+                    return database_for(instance.barbershop_id)
+        return current_database()
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_tenant_model(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_tenant_model(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La barbería (en 'default') se replica en el shard que la aloja y las señales
+        # de BarberShop mantienen la réplica al día, así que las relaciones de los
+        # modelos por barbería con ella son válidas entre bases.
+        related = {'barbershop'} | TENANT_MODELS
+        if obj1._meta.app_label == obj2._meta.app_label == 'scheduling':
+            if obj1._meta.model_name in related and obj2._meta.model_name in related:
+                return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # El mapa de shards solo existe en 'default'; el resto del esquema se crea en
+        # todas las bases para que las claves foráneas de cada shard sean válidas.
+        if app_label == 'scheduling' and model_name == 'tenantshard':
+            return db == DEFAULT_DB
+        return None
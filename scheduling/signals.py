@@ -0,0 +1,105 @@
+"""
+Receptores de señales de los modelos de scheduling. Se conectan en
+`SchedulingConfig.ready()`.
+"""
+import copy
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Appointment, BarberShop, Client, IdempotencyKey, Service
+from .sharding import DEFAULT_DB, check_tenant_writable, database_for, in_tenant_maintenance, tenant_maintenance
+
+# Campos de la cita que alteran los contadores del cliente.
+STATS_FIELDS = ('client_id', 'status', 'total_price', 'date')
+
+
+def block_writes_while_moving(sender, instance, using, raw=False, origin=None, **kwargs):
+    # Congelamiento de escrituras de `move_tenant`: se comprueba aquí, justo antes de cada
+    # escritura, y no solo al inicio del request en el middleware.
+    if raw:
+        return
+    # Al borrar la barbería se borran sus filas en cualquier base (p. ej. las que
+    # quedaron en el origen con `move_tenant --keep-source`).
+    if isinstance(origin, BarberShop) or getattr(origin, 'model', None) is BarberShop:
+        return
+    check_tenant_writable(instance.barbershop_id, using)
+
+
+# Solo los modelos por barbería: un receptor sin `sender` desactivaría los borrados
+# rápidos de todos los modelos.
+for model in (Service, Client, Appointment, IdempotencyKey):
+    pre_save.connect(block_writes_while_moving, sender=model)
+    pre_delete.connect(block_writes_while_moving, sender=model)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_stats(sender, instance, raw, using, **kwargs):
+    # Valores guardados antes de esta escritura, para saber en post_save si cambió algo
+    # que afecte a los contadores. La fila queda bloqueada hasta el final de la transacción
+    # que abre Appointment.save(), para que otra edición de la misma cita no se cuele.
+    instance._previous_stats = None
+    if instance.pk and not raw:
+        instance._previous_stats = sender.objects.using(using).select_for_update().filter(
+            pk=instance.pk
+        ).values(*STATS_FIELDS).first()
+
+
+@receiver(post_save, sender=Appointment)
+def update_client_stats_on_save(sender, instance, created, raw, using, **kwargs):
+    if raw or in_tenant_maintenance():
+        return
+    previous = getattr(instance, '_previous_stats', None)
+    affects_stats = instance.status == 'completed' or (previous and previous['status'] == 'completed')
+    changed = previous is None or previous != {field: getattr(instance, field) for field in STATS_FIELDS}
+    if affects_stats and changed:
+        Client.refresh_lifetime_stats(instance.client_id, using=using)
+        if previous and previous['client_id'] != instance.client_id:
+            Client.refresh_lifetime_stats(previous['client_id'], using=using)
+
+
+@receiver(post_delete, sender=Appointment)
+def update_client_stats_on_delete(sender, instance, using, **kwargs):
+    # Se dispara por cada cita también en QuerySet.delete(), en la acción "eliminar
+    # seleccionados" del admin y en los borrados en cascada.
+    # `move_tenant` copia los contadores tal cual; no hace falta recalcularlos al purgar.
+    if instance.status == 'completed' and not in_tenant_maintenance():
+        Client.refresh_lifetime_stats(instance.client_id, using=using)
+
+
+# Réplica de la barbería en su shard: `BarberShop` vive en 'default' y se copia en
+# el shard que aloja sus datos para que las claves foráneas sean válidas allí.
+
+def _save_replica(obj, alias):
+    # Se guarda una copia para no cambiar `_state.db` de la instancia original.
+    copy.copy(obj).save(using=alias)
+
+
+@receiver(post_save, sender=BarberShop)
+def update_barbershop_replica(sender, instance, raw, using, **kwargs):
+    if raw or using != DEFAULT_DB:
+        return
+    alias = database_for(instance.pk)
+    if alias != DEFAULT_DB:
+        with transaction.atomic(using=alias):
+            _save_replica(instance.owner, alias)
+            _save_replica(instance, alias)
+
+
+@receiver(pre_delete, sender=BarberShop)
+def remember_barbershop_replica(sender, instance, using, **kwargs):
+    # En post_delete el mapa de shards ya se borró en cascada.
+    instance._replica_database = database_for(instance.pk) if using == DEFAULT_DB else None
+
+
+@receiver(post_delete, sender=BarberShop)
+def delete_barbershop_replica(sender, instance, using, **kwargs):
+    alias = getattr(instance, '_replica_database', None)
+    if alias and alias != DEFAULT_DB:
+        # Se borran los datos de la barbería en el shard, en orden inverso a las claves
+        # foráneas. La réplica misma se conserva, como en `move_tenant`: borrarla con el
+        # ORM recorrería el mapa de shards, que no existe en el shard.
+        with tenant_maintenance(), transaction.atomic(using=alias):
+            for model in (IdempotencyKey, Appointment, Client, Service):
+                model.objects.using(alias).filter(barbershop_id=instance.pk).delete()
@@ -1,3 +1,639 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import warmup
+from .admin import EstimatedCountPaginator, estimate_row_count
+from .management.commands import move_tenant
+from .management.commands.loadtest import count_overlaps, percentile
+from .models import BarberShop, Service, Client, Appointment, IdempotencyKey, TenantShard
+from .sharding import TenantMoving, TenantRouter, database_for, tenant_maintenance, use_tenant_database
+
+
+class ClientLifetimeStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', password='secret')
+        cls.barbershop = BarberShop.objects.create(owner=owner, name="Barbería Central")
+        cls.service = Service.objects.create(
+            barbershop=cls.barbershop, name="Corte", price=Decimal('500.00'), duration_minutes=30
+        )
+
+    def setUp(self):
+        self.customer = Client.objects.create(barbershop=self.barbershop, name="Ana", phone="8095550000")
+
+    def make_appointment(self, day, price='500.00', status='pending', client=None):
+        return Appointment.objects.create(
+            barbershop=self.barbershop,
+            client=client or self.customer,
+            service=self.service,
+            date=date(2026, 1, day),
+            time=time(10),
+            total_price=Decimal(price),
+            status=status,
+        )
+
+    def assertStats(self, total_spent, visit_count, last_visit, client=None):
+        client = client or self.customer
+        client.refresh_from_db()
+        self.assertEqual(
+            (client.total_spent, client.visit_count, client.last_visit),
+            (Decimal(total_spent), visit_count, last_visit),
+        )
+
+    def test_completing_appointment_updates_stats(self):
+        appointment = self.make_appointment(5)
+        self.assertStats('0', 0, None)
+
+        appointment.status = 'completed'
+        appointment.save()
+        self.assertStats('500.00', 1, date(2026, 1, 5))
+
+    def test_cancelling_completed_appointment_updates_stats(self):
+        self.make_appointment(5, status='completed')
+        appointment = self.make_appointment(9, price='300.00', status='completed')
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertStats('500.00', 1, date(2026, 1, 5))
+
+    def test_editing_completed_appointment_updates_stats(self):
+        appointment = self.make_appointment(5, status='completed')
+
+        appointment.total_price = Decimal('650.00')
+        appointment.date = date(2026, 1, 7)
+        appointment.save()
+        self.assertStats('650.00', 1, date(2026, 1, 7))
+
+    def test_moving_completed_appointment_to_another_client(self):
+        other = Client.objects.create(barbershop=self.barbershop, name="Luis", phone="8095550001")
+        appointment = self.make_appointment(5, status='completed')
+
+        appointment.client = other
+        appointment.save()
+        self.assertStats('0', 0, None)
+        self.assertStats('500.00', 1, date(2026, 1, 5), client=other)
+
+    def test_deleting_appointment_updates_stats(self):
+        self.make_appointment(5, status='completed')
+        appointment = self.make_appointment(9, price='300.00', status='completed')
+
+        appointment.delete()
+        self.assertStats('500.00', 1, date(2026, 1, 5))
+
+    def test_queryset_delete_updates_stats(self):
+        self.make_appointment(5, status='completed')
+        self.make_appointment(9, price='300.00', status='completed')
+        self.make_appointment(12, price='300.00', status='completed')
+
+        Appointment.objects.filter(date__gt=date(2026, 1, 5)).delete()
+        self.assertStats('500.00', 1, date(2026, 1, 5))
+
+    def test_saving_stale_client_keeps_stats(self):
+        stale = Client.objects.get(pk=self.customer.pk)
+        self.make_appointment(5, status='completed')
+
+        stale.name = "Ana María"
+        stale.save()
+        self.assertStats('500.00', 1, date(2026, 1, 5))
+        self.assertEqual(self.customer.name, "Ana María")
+
+
+    def test_counter_refresh_failure_rolls_back_appointment(self):
+        appointment = self.make_appointment(5)
+
+        appointment.status = 'completed'
+        with mock.patch.object(Client, 'refresh_lifetime_stats', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                appointment.save()
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'pending')
+
+
+class RebuildClientStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', password='secret')
+        cls.barbershop = BarberShop.objects.create(owner=owner, name="Barbería Central")
+        cls.customer = Client.objects.create(barbershop=cls.barbershop, name="Ana", phone="8095550000")
+        for day, price in ((3, '500.00'), (8, '300.00')):
+            Appointment.objects.create(
+                barbershop=cls.barbershop, client=cls.customer, date=date(2026, 1, day),
+                time=time(10), total_price=Decimal(price), status='completed',
+            )
+
+    def rebuild(self, *args):
+        out = StringIO()
+        call_command('rebuild_client_stats', *args, stdout=out)
+        return out.getvalue()
+
+    def corrupt(self):
+        Client.objects.update(total_spent=0, visit_count=0, last_visit=None)
+
+    def test_fixes_drifted_counters(self):
+        self.corrupt()
+
+        self.assertIn("1 clientes revisados, 1 corregidos", self.rebuild())
+        self.customer.refresh_from_db()
+        self.assertEqual(
+            (self.customer.total_spent, self.customer.visit_count, self.customer.last_visit),
+            (Decimal('800.00'), 2, date(2026, 1, 8)),
+        )
+
+    def test_dry_run_does_not_write(self):
+        self.corrupt()
+
+        self.assertIn("1 con diferencias", self.rebuild('--dry-run'))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.visit_count, 0)
+
+    def test_consistent_counters_are_left_alone(self):
+        self.assertIn("0 corregidos", self.rebuild('--barbershop', str(self.barbershop.pk)))
+
+
+class ClientRankingQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', password='secret')
+        cls.barbershop = BarberShop.objects.create(owner=owner, name="Barbería Central")
+        cls.other_shop = BarberShop.objects.create(owner=owner, name="Otra Barbería")
+        cls.today = timezone.localdate()
+
+        def client(name, phone, total, visits, days_ago, barbershop=cls.barbershop):
+            # Los contadores se fijan directamente; su mantenimiento se prueba arriba.
+            Client.objects.create(barbershop=barbershop, name=name, phone=phone)
+            Client.objects.filter(phone=phone).update(
+                total_spent=Decimal(total), visit_count=visits,
+                last_visit=cls.today - timedelta(days=days_ago) if visits else None,
+            )
+
+        client("Ana", "1", '900.00', 3, 5)
+        client("Luis", "2", '1500.00', 6, 90)
+        client("Marta", "3", '200.00', 1, 61)
+        client("Nuevo", "4", '0', 0, 0)
+        client("Ajeno", "5", '5000.00', 9, 200, barbershop=cls.other_shop)
+
+    def names(self, queryset):
+        return [c.name for c in queryset]
+
+    def test_top_spenders(self):
+        self.assertEqual(self.names(Client.objects.top_spenders(self.barbershop)), ["Luis", "Ana", "Marta"])
+        self.assertEqual(self.names(Client.objects.top_spenders(self.barbershop, limit=1)), ["Luis"])
+
+    def test_lapsed(self):
+        since = self.today - timedelta(days=60)
+        self.assertEqual(self.names(Client.objects.lapsed(self.barbershop, since)), ["Luis", "Marta"])
+
+    def test_dashboard_uses_counters(self):
+        response = self.client.get(reverse('scheduling:dashboard'))
+        self.assertEqual(self.names(response.context['client_ranking']), ["Luis", "Ana", "Marta"])
+        self.assertEqual(self.names(response.context['lapsed_clients']), ["Luis", "Marta"])
+
+
+class BookingIdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', password='secret')
+        cls.barbershop = BarberShop.objects.create(owner=owner, name="Barbería Central")
+        cls.service = Service.objects.create(
+            barbershop=cls.barbershop, name="Corte", price=Decimal('500.00'), duration_minutes=30
+        )
+        cls.url = reverse('public_booking', args=[cls.service.pk])
+
+    def booking_data(self, **overrides):
+        data = {
+            'name': 'Juan Pérez',
+            'phone': '8095551234',
+            'date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+            'time': '10:00',
+            'idempotency_key': 'a' * 32,
+        }
+        data.update(overrides)
+        return data
+
+    def test_form_includes_idempotency_key(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'name="idempotency_key"')
+        self.assertEqual(len(response.context['idempotency_key']), 32)
+
+    def test_replayed_post_redirects_to_same_confirmation(self):
+        first = self.client.post(self.url, self.booking_data())
+        second = self.client.post(self.url, self.booking_data())
+
+        appointment = Appointment.objects.get()
+        expected = reverse('public_booking_confirmation', args=[appointment.pk])
+        self.assertRedirects(first, expected)
+        self.assertRedirects(second, expected)
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_post_without_key_still_books(self):
+        response = self.client.post(self.url, self.booking_data(idempotency_key=''))
+
+        appointment = Appointment.objects.get()
+        self.assertRedirects(response, reverse('public_booking_confirmation', args=[appointment.pk]))
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_key_is_not_replayed(self):
+        self.client.post(self.url, self.booking_data())
+        IdempotencyKey.objects.update(created_at=timezone.now() - IdempotencyKey.TTL - timedelta(minutes=1))
+
+        response = self.client.post(self.url, self.booking_data(time='11:00'))
+
+        self.assertEqual(Appointment.objects.count(), 2)
+        latest = Appointment.objects.latest('pk')
+        self.assertRedirects(response, reverse('public_booking_confirmation', args=[latest.pk]))
+        self.assertEqual(IdempotencyKey.objects.get().appointment, latest)
+
+
+@mock.patch.object(warmup, '_ready', False)
+class ReadinessTests(TestCase):
+    url = reverse('readiness_check')
+
+    def test_ready_after_warm_up(self):
+        self.assertFalse(warmup.is_ready())
+        self.assertTrue(warmup.warm_up())
+        self.assertTrue(warmup.is_ready())
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ready'})
+
+    def test_warm_up_without_database_is_not_ready(self):
+        with mock.patch.object(warmup, 'database_available', return_value=False):
+            self.assertFalse(warmup.warm_up())
+        self.assertFalse(warmup.is_ready())
+
+    def test_not_ready_while_database_unavailable(self):
+        with mock.patch.object(warmup, 'database_available', return_value=False):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'database_unavailable'})
+
+    def test_database_checked_on_every_probe(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        with mock.patch.object(warmup, 'database_available', return_value=False):
+            self.assertEqual(self.client.get(self.url).status_code, 503)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class LoadTestHelpersTests(SimpleTestCase):
+    def appointment(self, hour, minute=0, duration=30, day=1, barbershop_id=1):
+        return SimpleNamespace(
+            barbershop_id=barbershop_id,
+            date=date(2026, 1, day),
+            time=time(hour, minute),
+            service=SimpleNamespace(duration_minutes=duration),
+        )
+
+    def test_percentile_nearest_rank(self):
+        values = [5, 1, 4, 2, 3, 6, 8, 7, 10, 9]
+        self.assertEqual(percentile(values, 50), 5)
+        self.assertEqual(percentile(values, 95), 10)
+        self.assertEqual(percentile(values, 99), 10)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([42], 99), 42)
+
+    def test_no_overlaps(self):
+        appointments = [self.appointment(9), self.appointment(9, 30), self.appointment(10)]
+        self.assertEqual(count_overlaps(appointments), 0)
+
+    def test_overlapping_pairs(self):
+        # 9:00-10:00 se solapa con 9:15 y 9:45; 9:15-9:45 termina justo cuando empieza 9:45.
+        appointments = [self.appointment(9, duration=60), self.appointment(9, 15), self.appointment(9, 45)]
+        self.assertEqual(count_overlaps(appointments), 2)
+
+    def test_other_days_and_barbershops_do_not_overlap(self):
+        appointments = [self.appointment(9), self.appointment(9, day=2), self.appointment(9, barbershop_id=2)]
+        self.assertEqual(count_overlaps(appointments), 0)
+
+    def test_appointment_without_service(self):
+        # Sin servicio la cita dura 0 minutos, pero sigue cayendo dentro de otra.
+        appointments = [self.appointment(9), SimpleNamespace(
+            barbershop_id=1, date=date(2026, 1, 1), time=time(9, 10), service=None,
+        )]
+        self.assertEqual(count_overlaps(appointments), 1)
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        cls.barbershop = BarberShop.objects.create(owner=cls.admin, name="Barbería Central")
+        cls.service = Service.objects.create(
+            barbershop=cls.barbershop, name="Corte", price=Decimal('500.00'), duration_minutes=30
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_appointments(self, count, start=0):
+        for n in range(start, start + count):
+            customer = Client.objects.create(barbershop=self.barbershop, name=f"Cliente {n}", phone=f"809{n:07d}")
+            Appointment.objects.create(
+                barbershop=self.barbershop, client=customer, service=self.service,
+                date=date(2026, 1, 1) + timedelta(days=n), time=time(10), total_price=Decimal('500.00'),
+            )
+
+    def test_appointment_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:scheduling_appointment_changelist')
+        self.add_appointments(1)
+        with CaptureQueriesContext(connection) as baseline:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.add_appointments(20, start=1)
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 21)
+
+    def test_changelists_do_not_list_every_barbershop(self):
+        BarberShop.objects.create(owner=self.admin, name="Otra Barbería")
+        for name in ('appointment', 'client', 'service'):
+            response = self.client.get(reverse(f'admin:scheduling_{name}_changelist'))
+            specs = response.context['cl'].filter_specs
+            self.assertNotIn('barbershop', [getattr(spec, 'field_path', None) for spec in specs])
+
+    def test_search_by_barbershop_name(self):
+        self.add_appointments(2)
+        response = self.client.get(reverse('admin:scheduling_appointment_changelist'), {'q': 'Central'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', password='secret')
+        cls.barbershop = BarberShop.objects.create(owner=owner, name="Barbería Central")
+        for n in range(3):
+            Client.objects.create(barbershop=cls.barbershop, name=f"Cliente {n}", phone=str(n))
+
+    def test_sqlite_has_no_estimate(self):
+        self.assertIsNone(estimate_row_count(Client, 'default'))
+        self.assertEqual(EstimatedCountPaginator(Client.objects.order_by('pk'), 2).count, 3)
+
+    @mock.patch('scheduling.admin.estimate_row_count', return_value=50000)
+    def test_uses_estimate_for_large_unfiltered_tables(self, estimate):
+        self.assertEqual(EstimatedCountPaginator(Client.objects.order_by('pk'), 2).count, 50000)
+
+    @mock.patch('scheduling.admin.estimate_row_count', return_value=50000)
+    def test_counts_exactly_when_filtered(self, estimate):
+        queryset = Client.objects.filter(name="Cliente 1").order_by('pk')
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 1)
+        estimate.assert_not_called()
+
+    @mock.patch('scheduling.admin.estimate_row_count', return_value=500)
+    def test_counts_exactly_below_threshold(self, estimate):
+        self.assertEqual(EstimatedCountPaginator(Client.objects.order_by('pk'), 2).count, 3)
+
+
+@override_settings(TENANT_SHARDS=['shard1'])
+class ShardingTestCase(TestCase):
+    databases = {'default', 'shard1'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_superuser('owner', 'owner@example.com', 'secret')
+        cls.barbershop = BarberShop.objects.create(owner=cls.owner, name="Barbería Central")
+        cls.service = Service.objects.create(
+            barbershop=cls.barbershop, name="Corte", price=Decimal('500.00'), duration_minutes=30
+        )
+        cls.customer = Client.objects.create(barbershop=cls.barbershop, name="Ana", phone="8095550000")
+        cls.appointment = Appointment.objects.create(
+            barbershop=cls.barbershop, client=cls.customer, service=cls.service, date=date(2026, 1, 5),
+            time=time(10), total_price=Decimal('500.00'), status='completed',
+        )
+        IdempotencyKey.objects.create(key='a' * 32, barbershop=cls.barbershop, appointment=cls.appointment)
+
+    def move(self, database, **options):
+        out = StringIO()
+        call_command(
+            'move_tenant', self.barbershop.pk, database, drain_seconds=0, stdout=out, stderr=StringIO(), **options
+        )
+        return out.getvalue()
+
+    def counts(self, using):
+        return [
+            model.objects.using(using).filter(barbershop=self.barbershop).count()
+            for model in (Service, Client, Appointment, IdempotencyKey)
+        ]
+
+    def set_status(self, status, database='default'):
+        TenantShard.objects.update_or_create(
+            barbershop=self.barbershop, defaults={'status': status, 'database': database}
+        )
+
+
+class TenantRouterTests(ShardingTestCase):
+    def test_routes_by_instance_and_context(self):
+        router = TenantRouter()
+        self.move('shard1')
+
+        self.assertEqual(router.db_for_write(Client, instance=Client(barbershop=self.barbershop)), 'shard1')
+        self.assertEqual(router.db_for_read(Service, instance=self.barbershop), 'shard1')
+        self.assertIsNone(router.db_for_read(Client))
+        with use_tenant_database('shard1'):
+            self.assertEqual(router.db_for_read(Client), 'shard1')
+            # BarberShop y los usuarios no se enrutan.
+            self.assertIsNone(router.db_for_read(BarberShop))
+
+    def test_shard_map_only_migrates_to_default(self):
+        router = TenantRouter()
+        self.assertTrue(router.allow_migrate('default', 'scheduling', 'tenantshard'))
+        self.assertFalse(router.allow_migrate('shard1', 'scheduling', 'tenantshard'))
+        self.assertIsNone(router.allow_migrate('shard1', 'scheduling', 'client'))
+
+    def test_relations_between_barbershop_and_tenant_models(self):
+        router = TenantRouter()
+        self.assertTrue(router.allow_relation(self.customer, self.barbershop))
+        self.assertIsNone(router.allow_relation(self.barbershop, self.owner))
+
+
+class MoveTenantTests(ShardingTestCase):
+    def test_move_copies_and_purges_source(self):
+        self.move('shard1')
+
+        self.assertEqual(database_for(self.barbershop.pk), 'shard1')
+        self.assertEqual(TenantShard.objects.get().status, 'active')
+        self.assertEqual(self.counts('shard1'), [1, 1, 1, 1])
+        self.assertEqual(self.counts('default'), [0, 0, 0, 0])
+        self.assertTrue(BarberShop.objects.using('shard1').filter(pk=self.barbershop.pk).exists())
+        customer = Client.objects.using('shard1').get()
+        self.assertEqual((customer.pk, customer.visit_count, customer.total_spent), (self.customer.pk, 1, Decimal('500.00')))
+        appointment = Appointment.objects.using('shard1').get()
+        self.assertEqual((appointment.pk, appointment.created_at), (self.appointment.pk, self.appointment.created_at))
+
+    def test_keep_source(self):
+        self.move('shard1', keep_source=True)
+        self.assertEqual(self.counts('default'), [1, 1, 1, 1])
+        self.assertEqual(self.counts('shard1'), [1, 1, 1, 1])
+
+    def test_round_trip_back_to_default(self):
+        self.move('shard1')
+        self.move('default')
+
+        self.assertEqual(database_for(self.barbershop.pk), 'default')
+        self.assertEqual(self.counts('default'), [1, 1, 1, 1])
+        self.assertEqual(self.counts('shard1'), [0, 0, 0, 0])
+        self.assertEqual(Appointment.objects.using('default').get().pk, self.appointment.pk)
+
+    def test_prune_drops_rows_deleted_during_initial_copy(self):
+        extra = Client.objects.create(barbershop=self.barbershop, name="Luis", phone="8095550001")
+        sync = move_tenant.Command._sync
+
+        def delete_after_initial_copy(command, barbershop, source, target, prune=False, snapshot=None):
+            copied = sync(command, barbershop, source, target, prune=prune, snapshot=snapshot)
+            if not prune:
+                Client.objects.using(source).filter(pk=extra.pk).delete()
+            return copied
+
+        with mock.patch.object(move_tenant.Command, '_sync', delete_after_initial_copy):
+            self.move('shard1')
+        self.assertFalse(Client.objects.using('shard1').filter(pk=extra.pk).exists())
+        self.assertEqual(self.counts('shard1'), [1, 1, 1, 1])
+
+    def test_source_changed_during_resync_is_resynced_before_switching(self):
+        sync = move_tenant.Command._sync
+        calls = []
+
+        def change_source_once(command, barbershop, source, target, prune=False, snapshot=None):
+            copied = sync(command, barbershop, source, target, prune=prune, snapshot=snapshot)
+            if prune and not calls:
+                calls.append(source)
+                Client.objects.using(source).filter(pk=self.customer.pk).update(name="Ana María")
+            return copied
+
+        with mock.patch.object(move_tenant.Command, '_sync', change_source_once):
+            output = self.move('shard1')
+        self.assertIn("se repite (1/3)", output)
+        self.assertEqual(database_for(self.barbershop.pk), 'shard1')
+        self.assertEqual(Client.objects.using('shard1').get().name, "Ana María")
+
+    def test_source_that_keeps_changing_aborts_without_switching(self):
+        sync = move_tenant.Command._sync
+
+        def always_change_source(command, barbershop, source, target, prune=False, snapshot=None):
+            copied = sync(command, barbershop, source, target, prune=prune, snapshot=snapshot)
+            if prune:
+                Client.objects.using(source).filter(pk=self.customer.pk).update(name=Concat('name', Value("!")))
+            return copied
+
+        with mock.patch.object(move_tenant.Command, '_sync', always_change_source):
+            with self.assertRaisesMessage(CommandError, "siguió cambiando"):
+                self.move('shard1')
+        shard = TenantShard.objects.get()
+        self.assertEqual((shard.database, shard.status), ('default', 'active'))
+        self.assertEqual(self.counts('default'), [1, 1, 1, 1])
+
+    def test_pk_collision_aborts(self):
+        # Otra barbería ya alojada en shard1 cuyo servicio usa el mismo id.
+        other_owner = User.objects.create_user('other', password='secret')
+        other_owner.save(using='shard1')
+        other = BarberShop(pk=self.barbershop.pk + 100, owner=other_owner, name="Otra")
+        other.save(using='shard1')
+        with tenant_maintenance():
+            Service.objects.using('shard1').create(
+                pk=self.service.pk, barbershop=other, name="Tinte", price=Decimal('900.00'), duration_minutes=60
+            )
+
+        with self.assertRaisesMessage(CommandError, "No se movió nada"):
+            self.move('shard1')
+        self.assertEqual(database_for(self.barbershop.pk), 'default')
+        self.assertEqual(Service.objects.using('shard1').get().name, "Tinte")
+
+
+class WriteFreezeTests(ShardingTestCase):
+    def test_writes_blocked_while_moving(self):
+        self.set_status('moving')
+
+        with self.assertRaises(TenantMoving), transaction.atomic():
+            Client.objects.create(barbershop=self.barbershop, name="Luis", phone="8095550001")
+        with self.assertRaises(TenantMoving), transaction.atomic():
+            self.appointment.delete()
+        with tenant_maintenance():
+            Client.objects.create(barbershop=self.barbershop, name="Luis", phone="8095550001")
+
+    def test_writes_to_previous_database_blocked(self):
+        self.move('shard1', keep_source=True)
+
+        customer = Client.objects.using('default').get()
+        customer.name = "Ana María"
+        with self.assertRaises(TenantMoving), transaction.atomic():
+            customer.save()
+        customer = Client.objects.using('shard1').get()
+        customer.name = "Ana María"
+        customer.save()
+
+    def test_public_post_while_moving_returns_503(self):
+        self.set_status('moving')
+
+        self.assertEqual(self.client.get(reverse('public_home')).status_code, 200)
+        response = self.client.post(reverse('public_booking', args=[self.service.pk]), {
+            'name': 'Luis', 'phone': '8095550001', 'date': '2026-02-01', 'time': '10:00',
+        })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_admin_write_while_moving_returns_503(self):
+        self.set_status('moving')
+        self.client.force_login(self.owner)
+
+        response = self.client.post(reverse('admin:scheduling_client_change', args=[self.customer.pk]), {
+            'barbershop': self.barbershop.pk, 'name': 'Ana María', 'phone': '8095550000', 'nickname': '',
+        })
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(Client.objects.get().name, "Ana")
+
+    def test_public_booking_goes_to_shard(self):
+        self.move('shard1')
+
+        response = self.client.post(reverse('public_booking', args=[self.service.pk]), {
+            'name': 'Luis', 'phone': '8095550001', 'date': '2026-02-01', 'time': '10:00',
+            'idempotency_key': 'b' * 32,
+        })
+        appointment = Appointment.objects.using('shard1').get(client__phone='8095550001')
+        self.assertRedirects(response, reverse('public_booking_confirmation', args=[appointment.pk]))
+        self.assertEqual(Appointment.objects.using('default').count(), 0)
+
+    @mock.patch.object(warmup, '_ready', True)
+    def test_readiness_skips_tenant_resolution(self):
+        with mock.patch('scheduling.middleware.get_shard', side_effect=OperationalError):
+            self.assertEqual(self.client.get(reverse('readiness_check')).status_code, 200)
+            with mock.patch.object(warmup, 'database_available', return_value=False):
+                response = self.client.get(reverse('readiness_check'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'database_unavailable'})
+
+
+class BarberShopReplicaTests(ShardingTestCase):
+    def test_rename_updates_replica(self):
+        self.move('shard1')
+
+        self.barbershop.name = "Barbería Norte"
+        self.barbershop.save()
+        self.assertEqual(self.barbershop._state.db, 'default')
+        self.assertEqual(BarberShop.objects.using('shard1').get(pk=self.barbershop.pk).name, "Barbería Norte")
+
+    def test_delete_removes_shard_rows(self):
+        self.move('shard1')
+
+        BarberShop.objects.get(pk=self.barbershop.pk).delete()
+        self.assertEqual(self.counts('shard1'), [0, 0, 0, 0])
+
+    def test_delete_with_rows_left_in_source(self):
+        self.move('shard1', keep_source=True)
+
+        BarberShop.objects.get(pk=self.barbershop.pk).delete()
+        self.assertEqual(self.counts('default'), [0, 0, 0, 0])
+        self.assertEqual(self.counts('shard1'), [0, 0, 0, 0])
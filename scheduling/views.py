@@ -1,7 +1,19 @@
-from django.shortcuts import render
+import json
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from .models import Service, Client, Appointment, BarberShop
+from django.utils import timezone
+from django.views import View
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
+
+from .forms import AppointmentForm
+from .models import Service, Client, Appointment, BarberShop, IdempotencyKey
+from . import warmup
 
 # NOTA: Por ahora, asumimos que estamos trabajando con una única barbería.
 # En una fase posterior, filtraremos todo por la barbería del usuario autenticado.
@@ -79,8 +91,6 @@ class ClientDeleteView(DeleteView):
     template_name = 'scheduling/client_confirm_delete.html'
     success_url = reverse_lazy('scheduling:client_list')
 
-from .forms import AppointmentForm
-
 
 # --- Vistas para Citas ---
 
@@ -123,11 +133,6 @@ class AppointmentUpdateView(UpdateView):
         return kwargs
 
 
-from django.views.generic import TemplateView
-from django.utils import timezone
-from django.db.models import Sum
-import json
-
 class DashboardView(TemplateView):
     template_name = 'scheduling/dashboard.html'
 
@@ -155,14 +160,11 @@ class DashboardView(TemplateView):
         context['total_week'] = total_week
         context['total_month'] = total_month
 
-        # 2. Ranking de Clientes
-        client_ranking = Client.objects.filter(
-            barbershop=barbershop,
-            appointments__status='completed'
-        ).annotate(
-            total_spent=Sum('appointments__total_price')
-        ).order_by('-total_spent')[:5] # Top 5
-        context['client_ranking'] = client_ranking
+        # 2. Ranking de Clientes (contadores desnormalizados en Client, sin agregar el historial)
+        context['client_ranking'] = Client.objects.top_spenders(barbershop, limit=5)
+
+        # Clientes que no vienen desde hace más de 60 días
+        context['lapsed_clients'] = Client.objects.lapsed(barbershop, since=today - timedelta(days=60))[:5]
 
         # 3. Próximas Citas
         upcoming_appointments = Appointment.objects.filter(
@@ -202,10 +204,6 @@ class PublicServiceListView(ListView):
             return Service.objects.filter(barbershop=barbershop)
         return Service.objects.none()
 
-from django.http import JsonResponse
-from datetime import datetime, time, timedelta
-from django.views import View
-from django.shortcuts import get_object_or_404, redirect
 
 def get_available_slots(request):
     """
@@ -262,15 +260,32 @@ def get_available_slots(request):
     return JsonResponse({'available_slots': available_slots})
 
 
+def _valid_idempotency_key(value):
+    try:
+        return uuid.UUID(hex=value).hex
+    except (TypeError, ValueError):
+        return None
+
+
 class BookingView(View):
     def get(self, request, service_id):
         service = get_object_or_404(Service, pk=service_id)
         context = {
-            'service': service
+            'service': service,
+            # Cada formulario lleva su propia llave para reconocer reenvíos.
+            'idempotency_key': uuid.uuid4().hex,
         }
         return render(request, 'scheduling/booking_form.html', context)
 
     def post(self, request, service_id):
+        # Un reenvío del mismo formulario (reintento, doble toque) devuelve la cita original
+        # sin volver a escribir cliente ni cita.
+        idempotency_key = _valid_idempotency_key(request.POST.get('idempotency_key'))
+        if idempotency_key:
+            appointment_id = IdempotencyKey.appointment_for(idempotency_key)
+            if appointment_id:
+                return redirect('public_booking_confirmation', pk=appointment_id)
+
         service = get_object_or_404(Service, pk=service_id)
         barbershop = get_barbershop()
 
@@ -283,30 +298,49 @@ class BookingView(View):
         # Validación simple (se puede mejorar con un Django Form)
         if not all([client_name, client_phone, date_str, time_str]):
             # Manejar error
-            return render(request, 'scheduling/booking_form.html', {'service': service, 'error': 'Todos los campos son obligatorios.'})
+            return render(request, 'scheduling/booking_form.html', {
+                'service': service,
+                'error': 'Todos los campos son obligatorios.',
+                'idempotency_key': idempotency_key or uuid.uuid4().hex,
+            })
 
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
         time = datetime.strptime(time_str, '%H:%M').time()
 
-        # Buscar o crear al cliente
-        client, created = Client.objects.get_or_create(
-            phone=client_phone,
-            defaults={'name': client_name, 'barbershop': barbershop}
-        )
-        if not created and client.name != client_name:
-            client.name = client_name # Actualizar nombre si es diferente
-            client.save()
-
-        # Crear la cita
-        appointment = Appointment.objects.create(
-            barbershop=barbershop,
-            client=client,
-            service=service,
-            date=date,
-            time=time,
-            total_price=service.price,
-            status='pending'
-        )
+        try:
+            with transaction.atomic(using=router.db_for_write(Appointment)):
+                # Buscar o crear al cliente
+                client, created = Client.objects.get_or_create(
+                    phone=client_phone,
+                    defaults={'name': client_name, 'barbershop': barbershop}
+                )
+                if not created and client.name != client_name:
+                    client.name = client_name # Actualizar nombre si es diferente
+                    client.save()
+
+                # Crear la cita
+                appointment = Appointment.objects.create(
+                    barbershop=barbershop,
+                    client=client,
+                    service=service,
+                    date=date,
+                    time=time,
+                    total_price=service.price,
+                    status='pending'
+                )
+
+                if idempotency_key:
+                    # Una llave vencida que aún no se purgó se puede volver a usar.
+                    IdempotencyKey.expired().filter(key=idempotency_key).delete()
+                    IdempotencyKey.objects.create(
+                        key=idempotency_key, barbershop=barbershop, appointment=appointment
+                    )
+        except IntegrityError:
+            # Dos envíos simultáneos con la misma llave: el primero ya creó la cita.
+            appointment_id = idempotency_key and IdempotencyKey.appointment_for(idempotency_key)
+            if appointment_id:
+                return redirect('public_booking_confirmation', pk=appointment_id)
+            raise
 
         return redirect('public_booking_confirmation', pk=appointment.pk)
 
@@ -316,3 +350,14 @@ class BookingConfirmationView(View):
         return render(request, 'scheduling/booking_confirmation.html', {'appointment': appointment})
 
 
+def readiness_check(request):
+    """
+    Endpoint de readiness para el balanceador / autoscaler.
+    Devuelve 200 solo si el proceso completó el calentamiento (URLconf resuelto y
+    plantillas compiladas) y la base de datos responde en este momento; 503 si no.
+    Si el proceso no importó wsgi.py/asgi.py, el calentamiento se hace aquí.
+    """
+    # warm_up() solo falla si la base de datos no responde.
+    if not warmup.warm_up() or not warmup.database_available():
+        return JsonResponse({'status': 'database_unavailable'}, status=503)
+    return JsonResponse({'status': 'ready'})
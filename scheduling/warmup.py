@@ -0,0 +1,87 @@
+"""
+Calentamiento del proceso antes de atender tráfico.
+
+Con `gunicorn --preload` el proceso maestro importa `barberpro.wsgi` una sola
+vez y luego hace fork de los workers. Todo lo que se precalcule aquí (tablas
+de resolución de URLs, plantillas compiladas en el cached loader) se comparte
+con los workers por copy-on-write, de modo que el primer request de cada
+worker no paga ese costo.
+"""
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver, resolve, Resolver404
+
+# Plantillas que se renderizan en los requests más frecuentes.
+TEMPLATES = [
+    'scheduling/base.html',
+    'scheduling/public_service_list.html',
+    'scheduling/booking_form.html',
+    'scheduling/booking_confirmation.html',
+    'scheduling/dashboard.html',
+    'scheduling/service_list.html',
+    'scheduling/client_list.html',
+    'scheduling/appointment_list.html',
+    'scheduling/appointment_form.html',
+]
+
+# Rutas que se resuelven una vez para poblar las cachés del resolver.
+PATHS = [
+    '/',
+    '/api/available-slots/',
+    '/book/service/1/',
+    '/app/dashboard/',
+]
+
+_ready = False
+
+
+def is_ready():
+    return _ready
+
+
+def database_available():
+    """Comprueba que la base de datos por defecto acepta conexiones."""
+    try:
+        connections['default'].ensure_connection()
+    except DatabaseError:
+        return False
+    return True
+
+
+def warm_up():
+    """
+    Precalcula el URLconf y las plantillas y comprueba la base de datos. El proceso
+    solo queda listo si todo eso funciona; si la base no responde se puede volver a
+    llamar más tarde (el readiness check lo hace). Es idempotente.
+    """
+    global _ready
+    if _ready:
+        return True
+
+    # 1. Forzar la construcción de las tablas de reverse() y de los namespaces.
+    resolver = get_resolver()
+    resolver.reverse_dict
+    resolver.namespace_dict
+    resolver.app_dict
+    for path in PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            pass
+
+    # 2. Compilar las plantillas; el cached loader las guarda en memoria.
+    for name in TEMPLATES:
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+    # 3. Sin base de datos el proceso no puede atender requests.
+    reachable = database_available()
+
+    # 4. Nunca compartir conexiones a la base de datos entre procesos tras el fork.
+    connections.close_all()
+
+    _ready = reachable
+    return _ready